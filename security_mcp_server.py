@@ -4,15 +4,20 @@ BlackArch Security Tools MCP Server
 Provides security testing tools through MCP protocol for educational purposes
 """
 
-import subprocess
+import asyncio
 import time
 import logging
 import re
 import os
 import json
-from typing import Dict, List, Optional, Any
-from pathlib import Path
-from mcp.server.fastmcp import FastMCP
+import shlex
+import signal
+import socket
+import ipaddress
+import shutil
+import functools
+from typing import Dict, List, Optional, Any, Tuple, Union
+from mcp.server.fastmcp import Context, FastMCP
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -22,85 +27,350 @@ logger = logging.getLogger(__name__)
 mcp = FastMCP("BlackArchSecurityTools")
 
 # Security configuration
-ALLOWED_TARGETS_REGEX = re.compile(r'^(localhost|127\.0\.0\.1|10\.|192\.168\.|172\.)', re.IGNORECASE)
+ALLOWED_TARGET_PREFIXES = ("10.", "192.168.", "172.", "127.0.0.1", "localhost")
+ALLOWED_TARGET_PREFIXES_ASCII = tuple(prefix.encode("ascii") for prefix in ALLOWED_TARGET_PREFIXES)
+PORT_RE = re.compile(r'^[0-9,\-\s]+\Z')
+BLANK_LINE_RE = re.compile(r'(?m)^\s*\n')
+URL_HOST_RE = re.compile(r'[^:/?#]*')
+URL_PORT_RE = re.compile(r':(\d+)')
 MAX_SCAN_TIME = 300  # 5 minutes max per scan
 SCAN_DIRECTORY = "/tmp/scans"
 SAFE_PORTS = [22, 23, 25, 53, 80, 110, 143, 443, 993, 995]
+DEFAULT_PORTS = ",".join(str(port) for port in SAFE_PORTS)
+READ_CHUNK_SIZE = 64 * 1024
+MAX_CAPTURE = 8 * 1024 * 1024  # 8 MiB max captured per output stream
+TRUNCATION_MARKER = b"...[truncated]...\n"
+TERMINATE_GRACE = 5  # Seconds a capped scanner gets to exit before SIGKILL
+MAX_CONCURRENT_SCANS = max(1, int(os.environ.get("MCP_MAX_CONCURRENCY", 4)))  # 0 would block every scan
+DNS_CACHE_TTL = 900  # 15 minutes
+DNS_CACHE_SIZE = 512
+# Networks a resolved target address may fall in: RFC 1918, loopback, IPv6 unique local
+PERMITTED_NETWORKS = tuple(ipaddress.ip_network(network) for network in (
+    "10.0.0.0/8", "172.16.0.0/12", "192.168.0.0/16", "127.0.0.0/8", "::1/128", "fc00::/7"
+))
+
+# Nmap arguments and timeouts per scan type
+NMAP_SCAN_ARGS = {
+    "basic": ("-sS", "-T4"),
+    "aggressive": ("-sS", "-A", "-T4"),
+    "stealth": ("-sS", "-T2", "-f"),
+    "udp": ("-sU", "-T3")
+}
+NMAP_TIMEOUTS = {
+    "basic": 60,
+    "aggressive": 120,
+    "stealth": 180,
+    "udp": 240
+}
+
+# Constant argv head for each scan type, built once so nmap_scan only appends per-call values
+NMAP_ARGV_PREFIXES = {
+    scan_type: ("nmap", "-v", *args, "-p")
+    for scan_type, args in NMAP_SCAN_ARGS.items()
+}
+
+# Caps how many scanner processes run at once across all tool calls
+SCAN_SEMAPHORE = asyncio.Semaphore(MAX_CONCURRENT_SCANS)
+
+# Hostname -> (URL-ready address, resolved-at monotonic time), shared by all tool calls
+_dns_cache: Dict[str, Tuple[str, float]] = {}
+
+# (tool, PATH) -> located binary; misses are not cached
+_which_cache: Dict[Tuple[str, str], str] = {}
+
+# Set once SCAN_DIRECTORY is known to exist, so run_command skips the syscall
+_scan_dir_ready = False
+
+class LazyJoin:
+    """Defer shell-quoting a command until a log record is actually emitted"""
+    
+    def __init__(self, args: List[str]):
+        self.args = args
+    
+    def __str__(self) -> str:
+        return shlex.join(self.args)
+
+# The effective UID can't change without an explicit setuid, so check it once
+_IS_ROOT = os.geteuid() == 0
 
 def ensure_non_root():
     """Ensure we're not running as root for security"""
-    if os.geteuid() == 0:
+    if _IS_ROOT:
         logger.error("This tool should not be run as root for security reasons")
         raise PermissionError("Must run as non-root user")
 
-def sanitize_target(target: str) -> str:
-    """Sanitize and validate target IP/domain"""
+ensure_non_root()
+
+class _Rejected:
+    """Cached marker for a target that failed validation"""
+    
+    def __init__(self, reason: str):
+        self.reason = reason
+
+@functools.lru_cache(maxsize=256)
+def _sanitize_target_cached(target: str) -> Union[str, _Rejected]:
+    """Validate a target once; repeat lookups for the same target hit the cache"""
     target = target.strip()
     if not target:
-        raise ValueError>("Target cannot be empty")
+        return _Rejected("Target cannot be empty")
     
     # Only allow private networks and localhost for educational purposes
-    if not ALLOWED_TARGETS_REGEX.match(target):
-        raise ValueError(f"Target {target} not allowed. Only private networks (192.168.x.x, 10.x.x.x, localhost) permitted")
+    # Targets are ASCII, so compare bytes and skip Unicode-aware lowercasing
+    if not target.encode("ascii", "replace").lower().startswith(ALLOWED_TARGET_PREFIXES_ASCII):
+        return _Rejected(f"Target {target} not allowed. Only private networks (192.168.x.x, 10.x.x.x, localhost) permitted")
     
     return target
 
+def sanitize_target(target: str) -> str:
+    """Sanitize and validate target IP/domain"""
+    result = _sanitize_target_cached(target)
+    if isinstance(result, _Rejected):
+        raise ValueError(result.reason)
+    
+    return result
+
+def _is_permitted_address(address: str) -> bool:
+    """Check a resolved address against the private-network allow-list"""
+    ip = ipaddress.ip_address(address)
+    return any(ip in network for network in PERMITTED_NETWORKS)
+
+async def resolve_target_host(host: str) -> str:
+    """Resolve a target hostname for use in a URL, caching it for DNS_CACHE_TTL
+    
+    Every address the name resolves to must be permitted, since the tool could
+    connect to any of them. Names that don't resolve are rejected.
+    """
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        pass
+    else:
+        if not _is_permitted_address(host):
+            raise ValueError(f"Target {host} is not a permitted private address")
+        return host
+    
+    now = time.monotonic()
+    cached = _dns_cache.get(host)
+    if cached and now - cached[1] < DNS_CACHE_TTL:
+        return cached[0]
+    
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            host, None, family=socket.AF_UNSPEC, type=socket.SOCK_STREAM
+        )
+    except socket.gaierror as e:
+        raise ValueError(f"Target {host} could not be resolved: {e}")
+    
+    addresses = [info[4][0] for info in infos]
+    for address in addresses:
+        if not _is_permitted_address(address):
+            raise ValueError(f"Target {host} resolves to {address}, which is not a permitted private address")
+    
+    # Prefer IPv4; IPv6 literals need brackets inside URLs
+    ipv4 = [address for address in addresses if ":" not in address]
+    url_host = ipv4[0] if ipv4 else f"[{addresses[0]}]"
+    
+    if host not in _dns_cache and len(_dns_cache) >= DNS_CACHE_SIZE:
+        _dns_cache.pop(next(iter(_dns_cache)))  # Evict the oldest entry
+    _dns_cache[host] = (url_host, now)
+    
+    return url_host
+
+async def validate_scan_target(target: str) -> None:
+    """Check a target that is handed to the tool as-is (nmap, hydra)
+    
+    IP addresses and networks must fall inside PERMITTED_NETWORKS, and hostnames must
+    resolve only to permitted addresses. Other numeric nmap syntax such as
+    192.168.1.1-20 is left to the prefix check in sanitize_target.
+    """
+    try:
+        network = ipaddress.ip_network(target, strict=False)
+    except ValueError:
+        network = None
+    
+    if network is not None:
+        if not any(
+            network.version == permitted.version and network.subnet_of(permitted)
+            for permitted in PERMITTED_NETWORKS
+        ):
+            raise ValueError(f"Target {target} is not a permitted private network")
+    elif any(char.isalpha() for char in target):
+        await resolve_target_host(target)
+
+def _host_header(host: str, port: Optional[int], ssl: bool) -> str:
+    """Host header value for a name-based target, keeping any non-default port"""
+    if port is None or port == (443 if ssl else 80):
+        return host
+    return f"{host}:{port}"
+
 def sanitize_port_range(ports: str) -> str:
     """Sanitize port range input"""
     if not ports:
-        return "22,23,25,53,80,110,143,443,993,995"
+        return DEFAULT_PORTS
     
     # Basic validation - only numbers, commas, dashes
-    if not re.match(r'^[0-9,\-\s]+$', ports):
+    if not PORT_RE.match(ports):
         raise ValueError("Invalid port format. Use numbers, commas, or ranges (e.g., 80,443,8000-9000)")
     
     return ports
 
+@functools.lru_cache(maxsize=128)
+def _parse_opts(options: str) -> Tuple[str, ...]:
+    """Split user-supplied tool options shell-style, cached for repeat invocations"""
+    return tuple(shlex.split(options))
+
+def _which(tool: str, search_path: str) -> Optional[str]:
+    """Locate a tool binary, caching only hits so newly installed tools are picked up"""
+    key = (tool, search_path)
+    path = _which_cache.get(key)
+    if path is None:
+        path = shutil.which(tool, path=search_path)
+        if path is not None:
+            _which_cache[key] = path
+    return path
+
 def cleanup_temp_files():
     """Clean up temporary scan files"""
+    cutoff = time.time() - 3600  # 1 hour old
     try:
-        for file_path in Path(SCAN_DIRECTORY).glob("*.txt"):
-            if file_path.stat().st_mtime < time.time() - 3600:  # 1 hour old
-                file_path.unlink()
+        with os.scandir(SCAN_DIRECTORY) as entries:
+            for entry in entries:
+                if entry.name.endswith(".txt") and entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                    os.unlink(entry.path)
     except Exception as e:
         logger.warning(f"Failed to cleanup temp files: {e}")
 
-def run_command(cmd: List[str], timeout: int = MAX_SCAN_TIME) -> Dict[str, Any]:
-    """Run command with timeout and proper error handling"""
+def _signal_group(proc: asyncio.subprocess.Process, sig: int) -> None:
+    """Signal a scanner's whole process group, so forked helpers are stopped too"""
+    if proc.returncode is not None and proc.stdout.at_eof() and proc.stderr.at_eof():
+        return  # The scanner exited and nothing holds its pipes any more
     try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=timeout,
-            cwd=SCAN_DIRECTORY
-        )
+        os.killpg(proc.pid, sig)
+    except ProcessLookupError:
+        pass
+
+async def _kill_and_reap(proc: asyncio.subprocess.Process, cmd: List[str]) -> None:
+    """Kill a scanner's process group and wait for it, bounded in case something survives"""
+    _signal_group(proc, signal.SIGKILL)
+    try:
+        await asyncio.wait_for(proc.wait(), TERMINATE_GRACE)
+    except asyncio.TimeoutError:
+        logger.warning("Scanner output pipes still open after kill: %s", LazyJoin(cmd))
+
+async def _read_stream(stream: asyncio.StreamReader, proc: asyncio.subprocess.Process) -> Tuple[bytearray, bool]:
+    """Read a subprocess pipe incrementally, stopping the process once MAX_CAPTURE is hit"""
+    buf = bytearray()
+    while True:
+        chunk = await stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            return buf, False
+        if len(buf) + len(chunk) > MAX_CAPTURE:
+            buf.extend(chunk[:MAX_CAPTURE - len(buf)])
+            buf[:0] = TRUNCATION_MARKER
+            break
+        buf.extend(chunk)
+    
+    _signal_group(proc, signal.SIGTERM)
+    asyncio.get_running_loop().call_later(TERMINATE_GRACE, _signal_group, proc, signal.SIGKILL)
+    
+    # Keep draining until EOF: proc.wait() only finishes once every pipe is closed,
+    # and a forked grandchild may still be writing after the scanner itself exits
+    while await stream.read(READ_CHUNK_SIZE):
+        pass
+    return buf, True
+
+def _ensure_scan_dir(recheck: bool = False) -> None:
+    """Create the scan directory on first use, or again if it has gone missing"""
+    global _scan_dir_ready
+    if recheck:
+        _scan_dir_ready = os.path.isdir(SCAN_DIRECTORY)
+    if not _scan_dir_ready:
+        os.makedirs(SCAN_DIRECTORY, exist_ok=True)
+        _scan_dir_ready = True
+
+async def _spawn(cmd: List[str]) -> asyncio.subprocess.Process:
+    """Start a scanner in SCAN_DIRECTORY, recreating the directory if it was removed"""
+    _ensure_scan_dir()
+    # No preexec_fn and no uid/gid changes, so CPython can start the child with
+    # vfork() rather than a full fork(), even with cwd= set
+    for attempt in range(2):
+        try:
+            return await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=SCAN_DIRECTORY,
+                close_fds=True,
+                # Own session and process group, so a kill reaches forked helpers too
+                start_new_session=True
+            )
+        except FileNotFoundError:
+            if attempt or os.path.isdir(SCAN_DIRECTORY):
+                raise  # The tool binary itself is missing
+            _ensure_scan_dir(recheck=True)
+
+def decode_output(data: bytes) -> str:
+    """Decode captured tool output, replacing any bytes that aren't valid UTF-8"""
+    return data.decode("utf-8", errors="replace")
+
+async def run_command(cmd: List[str], timeout: int = MAX_SCAN_TIME) -> Dict[str, Any]:
+    """Run command asynchronously with timeout and proper error handling
+    
+    stdout and stderr are returned as raw bytes; use decode_output() when building text.
+    """
+    async with SCAN_SEMAPHORE:
+        try:
+            proc = await _spawn(cmd)
+        except Exception as e:
+            return {
+                "success": False,
+                "stdout": b"",
+                "stderr": f"Command execution error: {str(e)}".encode(),
+                "return_code": -1
+            }
+        
+        finished = False
+        try:
+            (stdout, stdout_truncated), (stderr, _), _ = await asyncio.wait_for(
+                asyncio.gather(
+                    _read_stream(proc.stdout, proc),
+                    _read_stream(proc.stderr, proc),
+                    proc.wait()
+                ),
+                timeout
+            )
+            finished = True
+        except asyncio.TimeoutError:
+            return {
+                "success": False,
+                "stdout": b"",
+                "stderr": f"Command timed out after {timeout} seconds".encode(),
+                "return_code": -1
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "stdout": b"",
+                "stderr": f"Command execution error: {str(e)}".encode(),
+                "return_code": -1
+            }
+        finally:
+            # Covers timeouts, errors and cancellation of the MCP request alike
+            if not finished:
+                await _kill_and_reap(proc, cmd)
         
         return {
-            "success": result.returncode == 0,
-            "stdout": result.stdout,
-            "stderr": result.stderr,
-            "return_code": result.returncode
-        }
-    except subprocess.TimeoutExpired:
-        return {
-            "success": False,
-            "stdout": "",
-            "stderr": f"Command timed out after {timeout} seconds",
-            "return_code": -1
-        }
-    except Exception as e:
-        return {
-            "success": False,
-            "stdout": "",
-            "stderr": f"Command execution error: {str(e)}",
-            "return_code": -1
+            # A scan we stopped for producing too much output still has usable results
+            "success": proc.returncode == 0 or stdout_truncated,
+            "stdout": bytes(stdout),
+            "stderr": bytes(stderr),
+            "return_code": proc.returncode
         }
 
 # Security tool wrappers
 
 @mcp.tool()
-def nmap_scan(target: str, scan_type: str = "basic", ports: str = "", options: str = "") -> str:
+async def nmap_scan(target: str, scan_type: str = "basic", ports: str = "", options: str = "") -> str:
     """
     Perform nmap network scan
     
@@ -113,56 +383,32 @@ def nmap_scan(target: str, scan_type: str = "basic", ports: str = "", options: s
     Returns:
         Formatted nmap results
     """
-    ensure_non_root()
     target = sanitize_target(target)
+    await validate_scan_target(target)
     
-    # Set scan timeout based on type
-    timeouts = {
-        "basic": 60,
-        "aggressive": 120,
-        "stealth": 180,
-        "udp": 240
-    }
-    timeout = timeouts.get(scan_type, 60)
-    
-    # Build nmap command
-    cmd = ["nmap", "-v"]
-    
-    # Add scan type specific options
-    if scan_type == "basic":
-        cmd.extend(["-sS", "-T4"])
-    elif scan_type == "aggressive":
-        cmd.extend(["-sS", "-A", "-T4"])
-    elif scan_type == "stealth":
-        cmd.extend(["-sS -T2", "-f"])
-    elif scan_type == "udp":
-        cmd.extend(["-sU", "-T3"])
-    
-    # Add ports
-    if ports:
-        ports_sanitized = sanitize_port_range(ports)
-        cmd.extend(["-p", ports_sanitized])
-    else:
-        cmd.extend(["-p", "22,23,25,53,80,110,143,443,993,995"])
+    if scan_type not in NMAP_ARGV_PREFIXES:
+        raise ValueError(f"Invalid scan type {scan_type}. Use one of: {', '.join(NMAP_ARGV_PREFIXES)}")
     
-    # Add target
-    cmd.append(target)
+    timeout = NMAP_TIMEOUTS[scan_type]
     
-    # Add additional options if specified
-    if options:
-        cmd.extend(options.split())
+    cmd = [
+        *NMAP_ARGV_PREFIXES[scan_type],
+        sanitize_port_range(ports),
+        target,
+        *_parse_opts(options)
+    ]
     
-    logger.info(f"Running nmap scan: {' '.join(cmd)}")
+    logger.info("Running nmap scan: %s", LazyJoin(cmd))
     
-    result = run_command(cmd, timeout)
+    result = await run_command(cmd, timeout)
     
     if result["success"]:
-        return f"✅ Nmap {scan_type} scan completed successfully\n\n{result['stdout']}"
+        return f"✅ Nmap {scan_type} scan completed successfully\n\n{decode_output(result['stdout'])}"
     else:
-        return f"❌ Nmap scan failed\n\nError: {result['stderr']}\n\nCommand: {' '.join(cmd)}"
+        return f"❌ Nmap scan failed\n\nError: {decode_output(result['stderr'])}\n\nCommand: {' '.join(cmd)}"
 
 @mcp.tool()
-def nikto_scan(target: str, port: int = 80, ssl: bool = False) -> str:
+async def nikto_scan(target: str, port: int = 80, ssl: bool = False) -> str:
     """
     Perform web vulnerability scan using Nikto
     
@@ -174,33 +420,32 @@ def nikto_scan(target: str, port: int = 80, ssl: bool = False) -> str:
     Returns:
         Formatted Nikto scan results
     """
-    ensure_non_root()
     target = sanitize_target(target)
     
+    address = await resolve_target_host(target)
+    
     protocol = "https" if ssl else "http"
     url = f"{protocol}://{target}:{port}"
     
-    cmd = ["nikto", "-h", url, "-Format", "txt"]
+    cmd = ["nikto", "-h", f"{protocol}://{address}:{port}", "-Format", "txt"]
+    
+    if address != target:
+        cmd.extend(["-vhost", _host_header(target, port, ssl)])
     
-    logger.info(f"Running Nikto scan: {' '.join(cmd)}")
+    logger.info("Running Nikto scan: %s", LazyJoin(cmd))
     
-    result = run_command(cmd)
+    result = await run_command(cmd)
     
     if result["success"]:
-        # Parse and format results
-        lines = result["stdout"].strip().split('\n')
-        formatted_output = []
+        # Drop blank lines from the report in a single pass
+        formatted_output = BLANK_LINE_RE.sub('', decode_output(result["stdout"])).strip()
         
-        for line in lines:
-            if line.strip():
-                formatted_output.append(line)
-        
-        return f"✅ Nikto scan completed for {url}\n\n" + "\n".join(formatted_output)
+        return f"✅ Nikto scan completed for {url}\n\n{formatted_output}"
     else:
-        return f"❌ Nikto scan failed\n\nError: {result['stderr']}"
+        return f"❌ Nikto scan failed\n\nError: {decode_output(result['stderr'])}"
 
 @mcp.tool()
-def dirb_scan(target: str, port: int = 80, ssl: bool = False, wordlist: str = "") -> str:
+async def dirb_scan(target: str, port: int = 80, ssl: bool = False, wordlist: str = "") -> str:
     """
     Perform directory brute force scan using Dirb
     
@@ -213,28 +458,29 @@ def dirb_scan(target: str, port: int = 80, ssl: bool = False, wordlist: str = ""
     Returns:
         Formatted Dirb scan results
     """
-    ensure_non_root()
     target = sanitize_target(target)
     
+    address = await resolve_target_host(target)
+    
     protocol = "https" if ssl else "http"
     url = f"{protocol}://{target}:{port}"
     
-    cmd = ["dirb": url]
+    cmd = ["dirb", f"{protocol}://{address}:{port}"] + ([wordlist] if wordlist else [])
     
-    if wordlist:
-        cmd.append(wordlist)
+    if address != target:
+        cmd.extend(["-H", f"Host: {_host_header(target, port, ssl)}"])
     
-    logger.info(f"Running Dirb scan: {' '.join(cmd)}")
+    logger.info("Running Dirb scan: %s", LazyJoin(cmd))
     
-    result = run_command(cmd, 180)  # 3 minute timeout for dirb
+    result = await run_command(cmd, 180)  # 3 minute timeout for dirb
     
     if result["success"]:
-        return f"✅ Dirb scan completed for {url}\n\n{result['stdout']}"
+        return f"✅ Dirb scan completed for {url}\n\n{decode_output(result['stdout'])}"
     else:
-        return f"❌ Dirb scan failed\n\nError: {result['stderr']}"
+        return f"❌ Dirb scan failed\n\nError: {decode_output(result['stderr'])}"
 
 @mcp.tool()
-def wpscan_scan(target: str, port: int = 80, ssl: bool = False, enumerate: List[str] = None) -> str:
+async def wpscan_scan(target: str, port: int = 80, ssl: bool = False, enumerate: List[str] = None) -> str:
     """
     Scan WordPress sites for vulnerabilities using WPScan
     
@@ -247,29 +493,33 @@ def wpscan_scan(target: str, port: int = 80, ssl: bool = False, enumerate: List[
     Returns:
         Formatted WPScan results
     """
-    ensure_non_root()
     target = sanitize_target(target)
     
+    address = await resolve_target_host(target)
+    
     protocol = "https" if ssl else "http"
     url = f"{protocol}://{target}:{port}"
     
-    cmd = ["wpscan", "--url", url, "--no-banner"]
+    cmd = ["wpscan", "--url", f"{protocol}://{address}:{port}", "--no-banner"]
+    
+    if address != target:
+        cmd.extend(["--vhost", _host_header(target, port, ssl)])
     
     if enumerate:
         for item in enumerate:
             cmd.extend(["--enumerate", item])
     
-    logger.info(f"Running WPScan: {' '.join(cmd)}")
+    logger.info("Running WPScan: %s", LazyJoin(cmd))
     
-    result = run_command(cmd, 300)
+    result = await run_command(cmd, 300)
     
     if result["success"]:
-        return f"✅ WPScan completed for {url}\n\n{result['stdout']}"
+        return f"✅ WPScan completed for {url}\n\n{decode_output(result['stdout'])}"
     else:
-        return f"❌ WPScan failed\n\nError: {result['stderr']}"
+        return f"❌ WPScan failed\n\nError: {decode_output(result['stderr'])}"
 
 @mcp.tool()
-def sqlmap_scan(target: str, method: str = "GET", data: str = "", cookie: str = "") -> str:
+async def sqlmap_scan(target: str, method: str = "GET", data: str = "", cookie: str = "") -> str:
     """
     Test for SQL injection vulnerabilities using SQLMap
     
@@ -282,10 +532,18 @@ def sqlmap_scan(target: str, method: str = "GET", data: str = "", cookie: str =
     Returns:
         Formatted SQLMap results
     """
-    ensure_non_root()
     target = sanitize_target(target)
     
-    cmd = ["sqlmap", "-u", target, "--batch", "--no-logging"]
+    # The target may carry a port and path after the host part
+    host = URL_HOST_RE.match(target).group()
+    port_match = URL_PORT_RE.match(target, len(host))
+    port = int(port_match.group(1)) if port_match else None
+    address = await resolve_target_host(host)
+    
+    cmd = ["sqlmap", "-u", address + target[len(host):], "--batch", "--no-logging"]
+    
+    if address != host:
+        cmd.extend(["--host", _host_header(host, port, False)])
     
     if method.upper() == "POST":
         cmd.extend(["--data", data])
@@ -293,17 +551,17 @@ def sqlmap_scan(target: str, method: str = "GET", data: str = "", cookie: str =
     if cookie:
         cmd.extend(["--cookie", cookie])
     
-    logger.info(f"Running SQLMap: {' '.join(cmd)}")
+    logger.info("Running SQLMap: %s", LazyJoin(cmd))
     
-    result = run_command(cmd, 300)
+    result = await run_command(cmd, 300)
     
     if result["success"]:
-        return f"✅ SQLMap scan completed for {target}\n\n{result['stdout']}"
+        return f"✅ SQLMap scan completed for {target}\n\n{decode_output(result['stdout'])}"
     else:
-        return f"❌ SQLMap scan failed\n\nError: {result['stderr']}"
+        return f"❌ SQLMap scan failed\n\nError: {decode_output(result['stderr'])}"
 
 @mcp.tool()
-def searchsploit_search(keyword: str, platform: str = "", exploit_type: str = "") -> str:
+async def searchsploit_search(keyword: str, platform: str = "", exploit_type: str = "") -> str:
     """
     Search for known exploits using SearchSploit
     
@@ -323,17 +581,17 @@ def searchsploit_search(keyword: str, platform: str = "", exploit_type: str = ""
     if exploit_type:
         cmd.extend(["-t", exploit_type])
     
-    logger.info(f"Running SearchSploit: {' '.join(cmd)}")
+    logger.info("Running SearchSploit: %s", LazyJoin(cmd))
     
-    result = run_command(cmd)
+    result = await run_command(cmd)
     
     if result["success"]:
-        return f"✅ SearchSploit search completed for '{keyword}'\n\n{result['stdout']}"
+        return f"✅ SearchSploit search completed for '{keyword}'\n\n{decode_output(result['stdout'])}"
     else:
-        return f"❌ SearchSploit search failed\n\nError: {result['stderr']}"
+        return f"❌ SearchSploit search failed\n\nError: {decode_output(result['stderr'])}"
 
 @mcp.tool()
-def hydra_bruteforce(target: str, service: str, username: str, wordlist: str = "") -> str:
+async def hydra_bruteforce(target: str, service: str, username: str, wordlist: str = "") -> str:
     """
     Perform brute force attack using Hydra (for authorized testing only)
     
@@ -346,27 +604,94 @@ def hydra_bruteforce(target: str, service: str, username: str, wordlist: str = "
     Returns:
         Formatted Hydra results
     """
-    ensure_non_root()
     target = sanitize_target(target)
+    await validate_scan_target(target)
     
     cmd = ["hydra", "-l", username, "-P", wordlist or "/usr/share/wordlists/rockyou.txt"]
     cmd.extend([target, service])
     
-    logger.info(f"Running Hydra: {' '.join(cmd)}")
+    logger.info("Running Hydra: %s", LazyJoin(cmd))
     
-    result = run_command(cmd, 180)
+    result = await run_command(cmd, 180)
     
     if result["success"]:
-        return f"✅ Hydra brute force completed\n\n{result['stdout']}"
+        return f"✅ Hydra brute force completed\n\n{decode_output(result['stdout'])}"
     else:
-        return f"❌ Hydra brute force failed\n\nError: {result['stderr']}"
+        return f"❌ Hydra brute force failed\n\nError: {decode_output(result['stderr'])}"
 
-# Informational tools
+# Scan suite
+
+SUITE_TOOLS = ["nmap", "nikto", "dirb", "wpscan", "sqlmap"]
 
 @mcp.tool()
-def list_available_tools() -> str:
-    """List all available security tools in the container"""
-    tools_info = """
+async def run_scan_suite(target: str, tools: List[str] = None, ctx: Context = None) -> str:
+    """
+    Run several scanners against one target concurrently
+    
+    Args:
+        target: Target host (allowed: private networks only)
+        tools: Scanners to run (nmap, nikto, dirb, wpscan, sqlmap; default: all)
+    
+    Returns:
+        Combined results from each scanner
+    """
+    target = sanitize_target(target)
+    await validate_scan_target(target)
+    
+    scanners = {
+        "nmap": nmap_scan,
+        "nikto": nikto_scan,
+        "dirb": dirb_scan,
+        "wpscan": wpscan_scan,
+        "sqlmap": sqlmap_scan
+    }
+    selected = list(dict.fromkeys(tools or SUITE_TOOLS))  # De-duplicate, keeping order
+    unknown = [tool for tool in selected if tool not in scanners]
+    if unknown:
+        raise ValueError(f"Unknown tools: {', '.join(unknown)}. Choose from: {', '.join(SUITE_TOOLS)}")
+    
+    logger.info("Running scan suite against %s: %s", target, LazyJoin(selected))
+    
+    completed = 0
+    
+    async def run_and_report(tool: str) -> str:
+        nonlocal completed
+        try:
+            return await scanners[tool](target)
+        finally:
+            completed += 1
+            if ctx is not None:
+                await ctx.report_progress(completed, len(selected))
+    
+    # SCAN_SEMAPHORE inside run_command bounds how many of these spawn at once
+    results = await asyncio.gather(
+        *(run_and_report(tool) for tool in selected),
+        return_exceptions=True
+    )
+    
+    sections = []
+    failed = 0
+    for tool, result in zip(selected, results):
+        if isinstance(result, Exception):
+            result = f"❌ {tool} failed\n\nError: {result}"
+        if result.startswith("❌"):
+            failed += 1
+        sections.append(f"=== {tool} ===\n{result}")
+    
+    if failed == len(selected):
+        header = f"❌ Scan suite failed for {target}"
+    elif failed:
+        header = f"⚠️ Scan suite completed for {target} with {failed} of {len(selected)} scanners failing"
+    else:
+        header = f"✅ Scan suite completed for {target}"
+    
+    return f"{header}\n\n" + "\n\n".join(sections)
+
+# Informational tools
+
+TOOL_COMMANDS = ("nmap", "nikto", "dirb", "wpscan", "sqlmap", "searchsploit", "hydra")
+
+TOOLS_INFO = """
     Available BlackArch Security Tools:
 
     Network Scanning:
@@ -387,27 +712,8 @@ def list_available_tools() -> str:
     - Available tools can be verified with: which <tool_name>
     - Tool versions: <tool_name> --version
     """
-    
-    # Check which tools are actually available
-    available_tools = []
-    tool_commands = ["nmap", "nikto", "dirb", "wpscan", "sqlmap", "searchsploit", "hydra"]
-    
-    for tool in tool_commands:
-        try:
-            result = subprocess.run(["which", tool], capture_output=True, text=True, timeout=5)
-            if result.returncode == 0:
-                available_tools.append(tool)
-        except:
-            pass
-    
-    available_info = f"\nCurrently installed tools: {', '.join(available_tools)}\n"
-    
-    return tools_info + available_info
 
-@mcp.tool()
-def show_security_disclaimer() -> str:
-    """Display security and legal disclaimer"""
-    return """
+SECURITY_DISCLAIMER = """
     ⚠️  SECURITY TESTING DISCLAIMER ⚠️
     
     This tool is for authorized security testing ONLY:
@@ -428,11 +734,26 @@ def show_security_disclaimer() -> str:
     Always obtain proper authorization before testing.
     """
 
+@mcp.tool()
+def list_available_tools() -> str:
+    """List all available security tools in the container"""
+    
+    # Check which tools are actually available
+    search_path = os.environ.get("PATH", os.defpath)
+    available_tools = [tool for tool in TOOL_COMMANDS if _which(tool, search_path)]
+    
+    return f"{TOOLS_INFO}\nCurrently installed tools: {', '.join(available_tools)}\n"
+
+@mcp.tool()
+def show_security_disclaimer() -> str:
+    """Display security and legal disclaimer"""
+    return SECURITY_DISCLAIMER
+
 # Initialize scan directory and cleanup
 if __name__ == "__main__":
     try:
         # Ensure scan directory exists
-        Path(SCAN_DIRECTORY).mkdir(exist_ok=True)
+        _ensure_scan_dir()
         
         # Cleanup old files
         cleanup_temp_files()
@@ -0,0 +1,341 @@
+"""Tests for security_mcp_server command execution and target resolution"""
+
+import asyncio
+import os
+import shutil
+import socket
+import sys
+import time
+
+import pytest
+
+pytest.importorskip("mcp.server.fastmcp")
+if os.geteuid() == 0:
+    pytest.skip("security_mcp_server refuses to import as root", allow_module_level=True)
+
+import security_mcp_server as server
+
+CAPTURE_LIMIT = 1024 * 1024
+
+
+@pytest.fixture(autouse=True)
+def isolated_server(monkeypatch, tmp_path):
+    """Shrink the capture cap and kill grace period, and start with empty caches"""
+    monkeypatch.setattr(server, "MAX_CAPTURE", CAPTURE_LIMIT)
+    monkeypatch.setattr(server, "TERMINATE_GRACE", 1)
+    monkeypatch.setattr(server, "SCAN_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(server, "_scan_dir_ready", False)
+    monkeypatch.setattr(server, "_dns_cache", {})
+
+
+def fake_dns(monkeypatch, address):
+    """Answer every lookup with one address, returning a list that records queried names"""
+    queries = []
+    
+    async def fake_getaddrinfo(self, host, *args, **kwargs):
+        queries.append(host)
+        family = socket.AF_INET6 if ":" in address else socket.AF_INET
+        return [(family, socket.SOCK_STREAM, 6, "", (address, 0))]
+    
+    monkeypatch.setattr(asyncio.BaseEventLoop, "getaddrinfo", fake_getaddrinfo)
+    return queries
+
+
+def capture_commands(monkeypatch):
+    """Replace run_command with a stub that records argv and reports success"""
+    commands = []
+    
+    async def fake_run_command(cmd, timeout=server.MAX_SCAN_TIME):
+        commands.append(cmd)
+        return {"success": True, "stdout": b"", "stderr": b"", "return_code": 0}
+    
+    monkeypatch.setattr(server, "run_command", fake_run_command)
+    return commands
+
+
+def process_gone(pid):
+    """True once a process has exited (a zombie left for init counts as gone)"""
+    try:
+        with open(f"/proc/{pid}/stat") as stat:
+            return stat.read().rsplit(")", 1)[1].split()[0] == "Z"
+    except FileNotFoundError:
+        return True
+
+
+def run(cmd, timeout):
+    """Run a command through run_command, returning the result and elapsed time"""
+    start = time.monotonic()
+    result = asyncio.run(server.run_command(cmd, timeout))
+    return result, time.monotonic() - start
+
+
+def test_capped_output_kills_process_ignoring_sigterm():
+    script = (
+        "import signal, sys\n"
+        "signal.signal(signal.SIGTERM, signal.SIG_IGN)\n"
+        "while True:\n"
+        "    sys.stdout.buffer.write(b'x' * 65536)\n"
+    )
+    result, elapsed = run([sys.executable, "-c", script], 30)
+    
+    assert elapsed < 10
+    assert result["success"]
+    assert result["stdout"].startswith(server.TRUNCATION_MARKER)
+    assert len(result["stdout"]) == len(server.TRUNCATION_MARKER) + CAPTURE_LIMIT
+
+
+def test_capped_output_kept_when_grandchild_holds_pipe():
+    result, elapsed = run(["sh", "-c", "head -c 20000000 /dev/zero; true"], 30)
+    
+    assert elapsed < 10
+    assert result["success"]
+    assert result["stdout"].startswith(server.TRUNCATION_MARKER)
+    assert len(result["stdout"]) == len(server.TRUNCATION_MARKER) + CAPTURE_LIMIT
+
+
+def test_cancelled_run_kills_process(tmp_path):
+    pid_file = tmp_path / "pid"
+    
+    async def cancel_midway():
+        task = asyncio.create_task(
+            server.run_command(["sh", "-c", f"echo $$ > {pid_file}; exec sleep 60"], 120)
+        )
+        while not pid_file.exists() or not pid_file.read_text().strip():
+            await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    
+    asyncio.run(cancel_midway())
+    
+    assert process_gone(int(pid_file.read_text()))
+
+
+
+def test_timeout_kills_grandchild_holding_pipes(tmp_path):
+    pid_file = tmp_path / "pid"
+    
+    result, elapsed = run(["sh", "-c", f"sleep 60 & echo $! > {pid_file}; wait"], 1)
+    
+    assert elapsed < 5
+    assert result["stderr"] == b"Command timed out after 1 seconds"
+    assert process_gone(int(pid_file.read_text()))
+
+
+
+def test_scan_directory_recreated_after_removal(monkeypatch, tmp_path):
+    scan_dir = tmp_path / "scans"
+    monkeypatch.setattr(server, "SCAN_DIRECTORY", str(scan_dir))
+    
+    first, _ = run(["pwd"], 10)
+    shutil.rmtree(scan_dir)
+    second, _ = run(["pwd"], 10)
+    
+    assert first["stdout"] == second["stdout"] == f"{scan_dir}\n".encode()
+    assert scan_dir.is_dir()
+
+
+@pytest.mark.parametrize("answers", [
+    [(socket.AF_INET6, socket.SOCK_STREAM, 6, "", ("2001:db8::1", 0, 0, 0))],
+    [
+        (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", 0)),
+        (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("203.0.113.5", 0)),
+    ],
+    [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("172.217.16.142", 0))],
+])
+def test_resolution_rejects_any_public_address(monkeypatch, answers):
+    async def fake_getaddrinfo(self, *args, **kwargs):
+        return answers
+    
+    monkeypatch.setattr(asyncio.BaseEventLoop, "getaddrinfo", fake_getaddrinfo)
+    
+    with pytest.raises(ValueError, match="not a permitted private address"):
+        asyncio.run(server.resolve_target_host("localhost.attacker.example"))
+
+
+def test_resolution_rejects_unresolvable_names(monkeypatch):
+    async def fake_getaddrinfo(self, *args, **kwargs):
+        raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+    
+    monkeypatch.setattr(asyncio.BaseEventLoop, "getaddrinfo", fake_getaddrinfo)
+    
+    with pytest.raises(ValueError, match="could not be resolved"):
+        asyncio.run(server.resolve_target_host("localhost.attacker.example"))
+
+
+def test_resolution_accepts_private_address_and_caches_it(monkeypatch):
+    queries = fake_dns(monkeypatch, "127.0.1.1")
+    
+    async def resolve_twice():
+        first = await server.resolve_target_host("localhost.lab")
+        second = await server.resolve_target_host("localhost.lab")
+        return first, second
+    
+    assert asyncio.run(resolve_twice()) == ("127.0.1.1", "127.0.1.1")
+    assert queries == ["localhost.lab"]
+
+
+def test_http_tools_scan_resolved_address_with_original_host(monkeypatch):
+    fake_dns(monkeypatch, "127.0.0.1")
+    commands = capture_commands(monkeypatch)
+    
+    async def scan():
+        await server.nikto_scan("localhost.lab")
+        await server.sqlmap_scan("localhost.lab/item.php?id=1")
+    
+    asyncio.run(scan())
+    
+    assert commands == [
+        ["nikto", "-h", "http://127.0.0.1:80", "-Format", "txt", "-vhost", "localhost.lab"],
+        ["sqlmap", "-u", "127.0.0.1/item.php?id=1", "--batch", "--no-logging", "--host", "localhost.lab"],
+    ]
+
+
+@pytest.mark.parametrize("target", ["localhost.attacker.example", "172.217.16.142", "172.0.0.0/8"])
+def test_raw_target_tools_validate_hostnames_and_networks(monkeypatch, target):
+    fake_dns(monkeypatch, "203.0.113.5")
+    commands = capture_commands(monkeypatch)
+    
+    with pytest.raises(ValueError):
+        asyncio.run(server.nmap_scan(target))
+    with pytest.raises(ValueError):
+        asyncio.run(server.hydra_bruteforce(target, "ssh", "admin"))
+    
+    assert commands == []
+
+
+def test_nmap_keeps_validated_hostname_in_argv(monkeypatch):
+    fake_dns(monkeypatch, "192.168.1.10")
+    commands = capture_commands(monkeypatch)
+    
+    asyncio.run(server.nmap_scan("localhost.lab"))
+    asyncio.run(server.nmap_scan("192.168.1.0/24"))
+    
+    assert [cmd[-1] for cmd in commands] == ["localhost.lab", "192.168.1.0/24"]
+
+
+def test_host_header_keeps_non_default_port(monkeypatch):
+    fake_dns(monkeypatch, "127.0.0.1")
+    commands = capture_commands(monkeypatch)
+    
+    async def scan():
+        await server.dirb_scan("localhost.lab", 8080)
+        await server.wpscan_scan("localhost.lab", 443, ssl=True)
+        await server.sqlmap_scan("localhost.lab:8080/x.php?id=1")
+    
+    asyncio.run(scan())
+    
+    assert commands[0][-2:] == ["-H", "Host: localhost.lab:8080"]
+    assert commands[1][-2:] == ["--vhost", "localhost.lab"]
+    assert commands[2][2] == "127.0.0.1:8080/x.php?id=1"
+    assert commands[2][-2:] == ["--host", "localhost.lab:8080"]
+
+
+@pytest.mark.parametrize("scan_type, scan_args", [
+    ("basic", ["-sS", "-T4"]),
+    ("aggressive", ["-sS", "-A", "-T4"]),
+    ("stealth", ["-sS", "-T2", "-f"]),
+    ("udp", ["-sU", "-T3"]),
+])
+def test_nmap_argv_per_scan_type(monkeypatch, scan_type, scan_args):
+    commands = capture_commands(monkeypatch)
+    
+    asyncio.run(server.nmap_scan("10.0.0.1", scan_type, "80,443", "--script \"http-title and safe\""))
+    
+    assert commands == [[
+        "nmap", "-v", *scan_args, "-p", "80,443", "10.0.0.1", "--script", "http-title and safe"
+    ]]
+
+
+def test_nmap_rejects_unknown_scan_type(monkeypatch):
+    commands = capture_commands(monkeypatch)
+    
+    with pytest.raises(ValueError, match="Invalid scan type"):
+        asyncio.run(server.nmap_scan("10.0.0.1", "bogus"))
+    
+    assert commands == []
+
+
+class ProgressRecorder:
+    """Stand-in for the FastMCP Context that records progress reports"""
+    
+    def __init__(self):
+        self.reports = []
+    
+    async def report_progress(self, progress, total):
+        self.reports.append((progress, total))
+
+
+def fake_scanners(monkeypatch, outcomes):
+    """Replace suite scanners with stubs returning (or raising) the given outcomes"""
+    calls = []
+    
+    for tool, outcome in outcomes.items():
+        async def scanner(target, tool=tool, outcome=outcome):
+            calls.append((tool, target))
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        
+        monkeypatch.setattr(server, f"{tool}_scan", scanner)
+    return calls
+
+
+def test_scan_suite_fans_out_and_reports_progress(monkeypatch):
+    calls = fake_scanners(monkeypatch, {
+        "nmap": "✅ nmap ok",
+        "nikto": "✅ nikto ok",
+        "dirb": "✅ dirb ok",
+    })
+    ctx = ProgressRecorder()
+    
+    output = asyncio.run(server.run_scan_suite("10.0.0.1", ["nmap", "nikto", "nmap", "dirb"], ctx))
+    
+    assert sorted(calls) == [("dirb", "10.0.0.1"), ("nikto", "10.0.0.1"), ("nmap", "10.0.0.1")]
+    assert ctx.reports == [(1, 3), (2, 3), (3, 3)]
+    assert output.startswith("✅ Scan suite completed for 10.0.0.1")
+    assert output.index("=== nmap ===") < output.index("=== nikto ===") < output.index("=== dirb ===")
+
+
+def test_scan_suite_renders_exceptions_and_failure_header(monkeypatch):
+    fake_scanners(monkeypatch, {
+        "nmap": "❌ Nmap scan failed",
+        "nikto": RuntimeError("boom"),
+    })
+    ctx = ProgressRecorder()
+    
+    output = asyncio.run(server.run_scan_suite("10.0.0.1", ["nmap", "nikto"], ctx))
+    
+    assert output.startswith("❌ Scan suite failed for 10.0.0.1")
+    assert "=== nikto ===\n❌ nikto failed\n\nError: boom" in output
+    assert ctx.reports == [(1, 2), (2, 2)]
+
+
+def test_scan_suite_flags_partial_failure(monkeypatch):
+    fake_scanners(monkeypatch, {"nmap": "✅ nmap ok", "dirb": "❌ Dirb scan failed"})
+    
+    output = asyncio.run(server.run_scan_suite("10.0.0.1", ["nmap", "dirb"]))
+    
+    assert output.startswith("⚠️ Scan suite completed for 10.0.0.1 with 1 of 2 scanners failing")
+
+
+def test_scan_suite_rejects_unknown_tools(monkeypatch):
+    calls = fake_scanners(monkeypatch, {"nmap": "✅ nmap ok"})
+    
+    with pytest.raises(ValueError, match="Unknown tools: Nmap"):
+        asyncio.run(server.run_scan_suite("10.0.0.1", ["nmap", "Nmap"]))
+    
+    assert calls == []
+
+
+def test_tool_lookup_picks_up_newly_installed_tools(monkeypatch, tmp_path):
+    monkeypatch.setattr(server, "_which_cache", {})
+    monkeypatch.setenv("PATH", str(tmp_path))
+    
+    assert "nmap" not in server.list_available_tools().rsplit(":", 1)[1]
+    
+    nmap = tmp_path / "nmap"
+    nmap.write_text("#!/bin/sh\n")
+    nmap.chmod(0o755)
+    
+    assert "nmap" in server.list_available_tools().rsplit(":", 1)[1]